@@ -1,10 +1,12 @@
 import asyncio
 import os
 import re
+import threading
 from dotenv import load_dotenv
 from src.browser import BrowserEngine
 from src.vision import VisionEngine
 from src.agent import TaskPlanner
+from src.resources import ResourceManager
 
 # Load environment variables from .env file
 load_dotenv()
@@ -64,6 +66,7 @@ async def execute_step(step_type, step_data, browser, vision, max_retries=3):
                 prompt = f"Find the element: '{target}'. Each UI element has a red box with an ID number inside. Which ID number is '{target}'? Reply with ONLY the number."
             
             response = vision.analyze_screen(image, prompt)
+            image.close()
             print(f"🤖 Found ID: {response}")
             
             # Extract and click
@@ -106,13 +109,48 @@ async def execute_step(step_type, step_data, browser, vision, max_retries=3):
     
     return False
 
+async def ask(prompt):
+    """
+    input() without blocking the event loop. Reads in a daemon thread so
+    a pending prompt never keeps the process alive on Ctrl+C.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def set_result(value):
+        if not future.done():
+            future.set_result(value)
+
+    def set_exception(error):
+        if not future.done():
+            future.set_exception(error)
+
+    def deliver(callback, arg):
+        try:
+            loop.call_soon_threadsafe(callback, arg)
+        except RuntimeError:
+            pass  # Event loop already closed
+
+    def read():
+        try:
+            value = input(prompt)
+        except Exception as e:
+            deliver(set_exception, e)
+        else:
+            deliver(set_result, value)
+
+    threading.Thread(target=read, daemon=True).start()
+    return await future
+
 async def main():
     # 1. Initialize Engines (Only once!)
     vision = VisionEngine()
     browser = BrowserEngine(headless=False)
     planner = TaskPlanner()
+    resources = ResourceManager()
     
     await browser.start()
+    resources.start()
     
     # 2. Go to Google to start
     await browser.navigate("https://www.google.com")
@@ -121,163 +159,194 @@ async def main():
     print("🤖 OCULAR AGENT READY (with Auto-Planning)")
     print("Type 'exit' to quit.")
     print("Type 'test vision' to test what the AI sees")
+    print("Type 'stats' to show memory/VRAM usage")
     print("Examples: 'search for football shoes on amazon'")
     print("          'find laptops on flipkart'")
     print("="*40 + "\n")
 
     # 3. The Infinite Loop
-    while True:
-        try:
-            # A. Get User Command
-            user_command = input("👉 Goal: ").strip()
-            if user_command.lower() == "exit":
-                break
+    try:
+        while True:
+            goal_started = False
+            try:
+                # A. Get User Command
+                user_command = (await ask("👉 Goal: ")).strip()
+                if user_command.lower() == "exit":
+                    break
             
-            # Test vision mode
-            if user_command.lower() == "test vision":
-                print("\n🔍 Testing vision capabilities...\n")
-                image, element_map = await browser.get_som_screenshot()
+                # Test vision mode
+                if user_command.lower() == "test vision":
+                    print("\n🔍 Testing vision capabilities...\n")
+                    image, element_map = await browser.get_som_screenshot()
                 
-                # Ask it various questions
-                questions = [
-                    "What website is this?",
-                    "Describe what you see on this page in detail.",
-                    "What are the main interactive elements visible?",
-                    "Is there a search box? If yes, describe where it is.",
-                ]
+                    # Ask it various questions
+                    questions = [
+                        "What website is this?",
+                        "Describe what you see on this page in detail.",
+                        "What are the main interactive elements visible?",
+                        "Is there a search box? If yes, describe where it is.",
+                    ]
                 
-                for q in questions:
-                    print(f"❓ {q}")
-                    answer = vision.analyze_screen(image, q)
-                    print(f"💬 {answer}\n")
+                    for q in questions:
+                        print(f"❓ {q}")
+                        answer = vision.analyze_screen(image, q)
+                        print(f"💬 {answer}\n")
                 
-                print(f"📊 Total elements detected: {len(element_map)}")
-                continue
+                    print(f"📊 Total elements detected: {len(element_map)}")
+                    resources.release_step(image)
+                    continue
+
+                if user_command.lower() == "stats":
+                    resources.print_metrics(browser)
+                    continue
 
-            # Ask for mode
-            mode = input("Mode? [1] Pre-planned [2] Reactive [3] Adaptive (default=3): ").strip()
-            if not mode:
-                mode = "3"
+                goal_started = True
+                resources.start_goal()
+
+                # Ask for mode
+                mode = (await ask("Mode? [1] Pre-planned [2] Reactive [3] Adaptive (default=3): ")).strip()
+                if not mode:
+                    mode = "3"
             
-            if mode == "3":
-                # NEW: Adaptive execution - plan + feedback loop
-                print(f"\n🧠 Creating initial plan for: '{user_command}'...")
-                plan = planner.create_plan(user_command)
+                if mode == "3":
+                    # NEW: Adaptive execution - plan + feedback loop
+                    print(f"\n🧠 Creating initial plan for: '{user_command}'...")
+                    plan = planner.create_plan(user_command)
                 
-                if not plan:
-                    print("❌ Could not create a plan. Try being more specific.")
-                    continue
+                    if not plan:
+                        print("❌ Could not create a plan. Try being more specific.")
+                        continue
                 
-                print(f"📋 Initial plan ({len(plan)} steps):")
-                for i, (step_type, step_data) in enumerate(plan, 1):
-                    print(f"   {i}. {step_type.upper()}: {step_data}")
+                    print(f"📋 Initial plan ({len(plan)} steps):")
+                    for i, (step_type, step_data) in enumerate(plan, 1):
+                        print(f"   {i}. {step_type.upper()}: {step_data}")
                 
-                print("\n🚀 Starting adaptive execution...\n")
-                completed_steps = []
-                max_iterations = 20
+                    print("\n🚀 Starting adaptive execution...\n")
+                    completed_steps = []
+                    max_iterations = 20
                 
-                for iteration in range(max_iterations):
-                    if not plan:
-                        print("\n✅ All steps completed!\n")
-                        break
+                    for iteration in range(max_iterations):
+                        if not plan:
+                            print("\n✅ All steps completed!\n")
+                            break
                     
-                    # Get next step from plan
-                    step_type, step_data = plan[0]
-                    plan = plan[1:]  # Remove from plan
+                        # Get next step from plan
+                        step_type, step_data = plan[0]
+                        plan = plan[1:]  # Remove from plan
                     
-                    print(f"[Step {iteration + 1}] 🎯 {step_type.upper()}: {step_data}")
+                        print(f"[Step {iteration + 1}] 🎯 {step_type.upper()}: {step_data}")
                     
-                    # Execute the step
-                    await execute_step(step_type, step_data, browser, vision)
-                    last_action = f"{step_type.upper()}: {step_data}"
-                    completed_steps.append(last_action)
+                        # Execute the step
+                        await execute_step(step_type, step_data, browser, vision)
+                        last_action = f"{step_type.upper()}: {step_data}"
+                        completed_steps.append(last_action)
                     
-                    # Verify and get feedback
-                    print("🔍 Verifying action...")
-                    image, element_map = await browser.get_som_screenshot()
-                    describe_prompt = "Describe what you see on this webpage in one sentence."
-                    screen_description = vision.analyze_screen(image, describe_prompt)
-                    print(f"👁️ Screen: {screen_description}")
+                        # Verify and get feedback
+                        print("🔍 Verifying action...")
+                        image, element_map = await browser.get_som_screenshot()
+                        describe_prompt = "Describe what you see on this webpage in one sentence."
+                        screen_description = vision.analyze_screen(image, describe_prompt)
+                        resources.release_step(image)
+                        print(f"👁️ Screen: {screen_description}")
                     
-                    # Check if we need to replan
-                    success, new_plan = planner.verify_and_replan(
-                        user_command, plan, completed_steps, screen_description, last_action
-                    )
+                        # Check if we need to replan
+                        success, new_plan = planner.verify_and_replan(
+                            user_command, plan, completed_steps, screen_description, last_action
+                        )
                     
-                    if not success and new_plan:
-                        print("⚠️ Action failed! Replanning...")
-                        print(f"📋 New plan ({len(new_plan)} steps):")
-                        for i, (st, sd) in enumerate(new_plan, 1):
-                            print(f"   {i}. {st.upper()}: {sd}")
-                        plan = new_plan
-                    elif success:
-                        print("✅ Action verified\n")
+                        if not success and new_plan:
+                            print("⚠️ Action failed! Replanning...")
+                            print(f"📋 New plan ({len(new_plan)} steps):")
+                            for i, (st, sd) in enumerate(new_plan, 1):
+                                print(f"   {i}. {st.upper()}: {sd}")
+                            plan = new_plan
+                        elif success:
+                            print("✅ Action verified\n")
                     
-                    await asyncio.sleep(1)
+                        note = await resources.check_step(browser)
+                        if note:
+                            completed_steps.append(note)
+                        await asyncio.sleep(1)
                 
-                if iteration >= max_iterations - 1:
-                    print("\n⚠️ Reached maximum iterations\n")
+                    if iteration >= max_iterations - 1:
+                        print("\n⚠️ Reached maximum iterations\n")
                     
-            elif mode == "1":
-                # OLD WAY: Pre-planned execution
-                print(f"\n🧠 Planning steps for: '{user_command}'...")
-                steps = planner.create_plan(user_command)
+                elif mode == "1":
+                    # OLD WAY: Pre-planned execution
+                    print(f"\n🧠 Planning steps for: '{user_command}'...")
+                    steps = planner.create_plan(user_command)
                 
-                if not steps:
-                    print("❌ Could not create a plan. Try being more specific.")
-                    continue
+                    if not steps:
+                        print("❌ Could not create a plan. Try being more specific.")
+                        continue
                 
-                print(f"📋 Plan created with {len(steps)} steps:")
-                for i, (step_type, step_data) in enumerate(steps, 1):
-                    print(f"   {i}. {step_type.upper()}: {step_data}")
+                    print(f"📋 Plan created with {len(steps)} steps:")
+                    for i, (step_type, step_data) in enumerate(steps, 1):
+                        print(f"   {i}. {step_type.upper()}: {step_data}")
                 
-                print("\n🚀 Executing plan...\n")
-                for i, (step_type, step_data) in enumerate(steps, 1):
-                    print(f"[Step {i}/{len(steps)}]", end=" ")
-                    await execute_step(step_type, step_data, browser, vision)
+                    print("\n🚀 Executing plan...\n")
+                    for i, (step_type, step_data) in enumerate(steps, 1):
+                        print(f"[Step {i}/{len(steps)}]", end=" ")
+                        await execute_step(step_type, step_data, browser, vision)
+                        await resources.check_step(browser)
                 
-                print("\n✅ Plan completed!\n")
-            else:
-                # NEW WAY: Reactive execution with feedback loop
-                print(f"\n🔄 Starting reactive execution for: '{user_command}'...\n")
-                completed_steps = []
-                max_steps = 20  # Safety limit
+                    print("\n✅ Plan completed!\n")
+                else:
+                    # NEW WAY: Reactive execution with feedback loop
+                    print(f"\n🔄 Starting reactive execution for: '{user_command}'...\n")
+                    completed_steps = []
+                    max_steps = 20  # Safety limit
                 
-                for step_num in range(1, max_steps + 1):
-                    # Get current screen state
-                    image, element_map = await browser.get_som_screenshot()
+                    for step_num in range(1, max_steps + 1):
+                        # Get current screen state
+                        image, element_map = await browser.get_som_screenshot()
                     
-                    # Ask vision model to describe what's on screen
-                    describe_prompt = "Describe what you see on this webpage in one sentence. What are the main elements visible?"
-                    screen_description = vision.analyze_screen(image, describe_prompt)
-                    print(f"👁️ Screen: {screen_description}")
+                        # Ask vision model to describe what's on screen
+                        describe_prompt = "Describe what you see on this webpage in one sentence. What are the main elements visible?"
+                        screen_description = vision.analyze_screen(image, describe_prompt)
+                        resources.release_step(image)
+                        print(f"👁️ Screen: {screen_description}")
                     
-                    # Ask planner what to do next
-                    next_action = planner.get_next_action(user_command, completed_steps, screen_description)
+                        # Ask planner what to do next
+                        next_action = planner.get_next_action(user_command, completed_steps, screen_description)
                     
-                    if next_action is None:
-                        print("\n✅ Goal achieved!\n")
-                        break
+                        if next_action is None:
+                            print("\n✅ Goal achieved!\n")
+                            break
                     
-                    step_type, step_data = next_action
-                    print(f"[Step {step_num}] 🎯 Next: {step_type.upper()} - {step_data}")
+                        step_type, step_data = next_action
+                        print(f"[Step {step_num}] 🎯 Next: {step_type.upper()} - {step_data}")
                     
-                    # Execute the action
-                    await execute_step(step_type, step_data, browser, vision)
+                        # Execute the action
+                        await execute_step(step_type, step_data, browser, vision)
                     
-                    # Record what we did
-                    completed_steps.append(f"{step_type.upper()}: {step_data}")
+                        # Record what we did
+                        completed_steps.append(f"{step_type.upper()}: {step_data}")
                     
-                    # Small delay between steps
-                    await asyncio.sleep(1)
+                        note = await resources.check_step(browser)
+                        if note:
+                            completed_steps.append(note)
+                    
+                        # Small delay between steps
+                        await asyncio.sleep(1)
                 
-                if step_num >= max_steps:
-                    print("\n⚠️ Reached maximum steps limit\n")
+                    if step_num >= max_steps:
+                        print("\n⚠️ Reached maximum steps limit\n")
 
-        except Exception as e:
-            print(f"⚠️ Error in loop: {e}")
+            except Exception as e:
+                print(f"⚠️ Error in loop: {e}")
 
-    await browser.stop()
+            finally:
+                # Free per-goal memory and recycle the browser context when due,
+                # failed goals included
+                if goal_started:
+                    try:
+                        await resources.end_goal(browser)
+                    except Exception as e:
+                        print(f"⚠️ Cleanup failed: {e}")
+    finally:
+        await resources.stop()
+        await browser.stop()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -7,6 +7,7 @@ class BrowserEngine:
     def __init__(self, headless=False):
         self.headless = headless
         self.browser = None
+        self.context = None
         self.page = None
         self.playwright = None
 
@@ -17,8 +18,56 @@ class BrowserEngine:
             args=['--start-maximized']
         )
         # Create context with no viewport to use full window size
-        context = await self.browser.new_context(no_viewport=True)
-        self.page = await context.new_page()
+        self.context = await self.browser.new_context(no_viewport=True)
+        self.page = await self.context.new_page()
+
+    async def recycle_context(self):
+        """
+        Replace the browser context with a fresh one to release the
+        memory held by old pages, keeping cookies/storage and the current URL.
+        The old context is only closed once the new one is ready.
+        """
+        url = self.page.url if self.page else None
+        storage_state = await self.context.storage_state()
+
+        context = await self.browser.new_context(no_viewport=True, storage_state=storage_state)
+        try:
+            page = await context.new_page()
+            if url and url.startswith('http'):
+                await page.goto(url, timeout=60000)
+                await page.wait_for_load_state("domcontentloaded")
+        except Exception:
+            await context.close()
+            raise
+
+        old_context = self.context
+        self.context = context
+        self.page = page
+        await old_context.close()
+        print("♻️ Browser context recycled")
+
+    async def close_extra_pages(self):
+        """
+        Close every page except the one the agent is working on (e.g. popups, new tabs).
+        Returns how many pages were closed.
+        """
+        closed = 0
+        for context in self.browser.contexts:
+            for page in context.pages:
+                if page is self.page:
+                    continue
+                try:
+                    await page.close()
+                    closed += 1
+                except Exception:
+                    pass  # Popup already closed itself
+        return closed
+
+    def page_count(self):
+        """Number of pages currently open across all contexts"""
+        if not self.browser:
+            return 0
+        return sum(len(context.pages) for context in self.browser.contexts)
 
     async def navigate(self, url):
         await self.page.goto(url, timeout=60000)  # 60 second timeout
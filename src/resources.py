@@ -0,0 +1,260 @@
+import asyncio
+import gc
+import os
+import time
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+
+def _env_mb(name, default):
+    """Read a megabyte limit from the environment (0 disables it)"""
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        print(f"⚠️ Ignoring invalid {name}={value!r}")
+        return default
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        print(f"⚠️ Ignoring invalid {name}={value!r}")
+        return default
+
+
+def get_rss_mb():
+    """Current resident set size of this Python process in MB (None if unknown)"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+
+    # Linux fallback without psutil
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def get_browser_rss_mb():
+    """
+    Resident memory of the browser in MB: the Playwright driver and the
+    Chromium processes it spawns, i.e. all child processes of this one.
+    Needs psutil (None without it).
+    """
+    if psutil is None:
+        return None
+    total = 0
+    for child in psutil.Process().children(recursive=True):
+        try:
+            total += child.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return total / (1024 * 1024)
+
+
+def get_vram_mb():
+    """Allocated and reserved CUDA memory in MB (None if no GPU)"""
+    if torch is None or not torch.cuda.is_available():
+        return None, None
+    allocated = torch.cuda.memory_allocated() / (1024 * 1024)
+    reserved = torch.cuda.memory_reserved() / (1024 * 1024)
+    return allocated, reserved
+
+
+class ResourceManager:
+    def __init__(self):
+        """
+        Keeps a long-running agent at a flat memory footprint.
+        Limits are read from the environment (0 = disabled):
+          OCULAR_BROWSER_SOFT_MB / OCULAR_BROWSER_HARD_MB -> recycle browser context
+                                                             (after the goal)
+          OCULAR_VRAM_SOFT_MB / OCULAR_VRAM_HARD_MB       -> free CUDA cache
+          OCULAR_MAX_PAGES                                -> close extra pages
+        Soft limits are checked at the end of a goal, hard limits between steps.
+        Browser limits need psutil.
+        """
+        self.browser_soft_mb = _env_mb("OCULAR_BROWSER_SOFT_MB", 2048)
+        self.browser_hard_mb = _env_mb("OCULAR_BROWSER_HARD_MB", 4096)
+        self.vram_soft_mb = _env_mb("OCULAR_VRAM_SOFT_MB", 0)
+        self.vram_hard_mb = _env_mb("OCULAR_VRAM_HARD_MB", 0)
+        self.max_pages = _env_int("OCULAR_MAX_PAGES", 5)
+
+        # Recycle the browser context every N goals (0 = only on limits)
+        self.recycle_every = _env_int("OCULAR_RECYCLE_EVERY", 5)
+        # Steps a hard limit stays quiet after it fired
+        self.cooldown_steps = _env_int("OCULAR_LIMIT_COOLDOWN", 5)
+        # How often the event loop lag probe wakes up, in seconds
+        self.lag_interval = 0.5
+
+        self.goals_since_recycle = 0
+        self.recycle_count = 0
+        self.recycle_pending = False
+        self.cooldowns = {"browser": 0, "vram": 0}
+        self.last_lag_ms = 0.0
+        self.goal_max_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self._lag_task = None
+
+    # --- Event loop lag ---
+
+    def start(self):
+        """Start the background event loop lag probe"""
+        if self._lag_task is None:
+            self._lag_task = asyncio.get_running_loop().create_task(self._watch_lag())
+
+    async def stop(self):
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            try:
+                await self._lag_task
+            except asyncio.CancelledError:
+                pass
+            self._lag_task = None
+
+    async def _watch_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            lag_ms = max(0.0, (loop.time() - expected) * 1000)
+            self.last_lag_ms = lag_ms
+            self.goal_max_lag_ms = max(self.goal_max_lag_ms, lag_ms)
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+
+    # --- Metrics ---
+
+    def get_metrics(self, browser=None):
+        """Snapshot of the live resource usage"""
+        vram_allocated, vram_reserved = get_vram_mb()
+        return {
+            "rss_mb": get_rss_mb(),
+            "browser_rss_mb": get_browser_rss_mb(),
+            "vram_allocated_mb": vram_allocated,
+            "vram_reserved_mb": vram_reserved,
+            "open_pages": browser.page_count() if browser else None,
+            "loop_lag_ms": self.last_lag_ms,
+            "goal_max_loop_lag_ms": self.goal_max_lag_ms,
+            "max_loop_lag_ms": self.max_lag_ms,
+            "context_recycles": self.recycle_count,
+        }
+
+    def print_metrics(self, browser=None):
+        metrics = self.get_metrics(browser)
+
+        def fmt(value, unit=""):
+            return "n/a" if value is None else f"{value:.0f}{unit}"
+
+        print(f"📊 RSS: {fmt(metrics['rss_mb'], ' MB')}"
+              f" | Browser: {fmt(metrics['browser_rss_mb'], ' MB')}"
+              f" | VRAM: {fmt(metrics['vram_allocated_mb'], ' MB')}"
+              f" (reserved {fmt(metrics['vram_reserved_mb'], ' MB')})"
+              f" | Pages: {fmt(metrics['open_pages'])}"
+              f" | Loop lag: {fmt(metrics['loop_lag_ms'], ' ms')}"
+              f" (last goal max {fmt(metrics['goal_max_loop_lag_ms'], ' ms')},"
+              f" session max {fmt(metrics['max_loop_lag_ms'], ' ms')})"
+              f" | Recycles: {metrics['context_recycles']}")
+
+    def _over(self, metric, soft):
+        """Check 'browser' memory or reserved 'vram' against its soft or hard limit"""
+        if metric == "browser":
+            limit = self.browser_soft_mb if soft else self.browser_hard_mb
+            value = get_browser_rss_mb()
+        else:
+            limit = self.vram_soft_mb if soft else self.vram_hard_mb
+            _, value = get_vram_mb()
+        return bool(limit) and value is not None and value > limit
+
+    def _pages_over(self, browser):
+        return bool(self.max_pages) and browser.page_count() > self.max_pages
+
+    # --- Lifecycle ---
+
+    def release_step(self, image):
+        """Drop the per-step screenshot as soon as it has been used"""
+        if image is not None:
+            image.close()
+
+    def free_memory(self):
+        """Run the garbage collector and hand cached CUDA blocks back"""
+        gc.collect()
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def start_goal(self):
+        """Called before every goal: start a fresh per-goal lag peak"""
+        self.goal_max_lag_ms = 0.0
+
+    async def check_step(self, browser):
+        """
+        Called between steps: only acts when a hard limit is crossed.
+        Never reloads the page mid-goal; a context recycle is deferred to
+        end_goal. Returns a note for the planner when pages were closed.
+        """
+        closed = 0
+        if self._pages_over(browser):
+            print(f"🚨 More than {self.max_pages} pages open, closing extra pages...")
+            closed += await browser.close_extra_pages()
+
+        if self.cooldowns["vram"]:
+            self.cooldowns["vram"] -= 1
+        elif self._over("vram", soft=False):
+            print("🚨 Hard VRAM limit exceeded, freeing CUDA cache...")
+            self.free_memory()
+            self.cooldowns["vram"] = self.cooldown_steps
+
+        if self.cooldowns["browser"]:
+            self.cooldowns["browser"] -= 1
+        elif self._over("browser", soft=False):
+            print("🚨 Hard browser memory limit exceeded, recycling context after this goal...")
+            self.recycle_pending = True
+            closed += await browser.close_extra_pages()
+            self.cooldowns["browser"] = self.cooldown_steps
+
+        if closed:
+            return f"SYSTEM: closed {closed} extra browser page(s)/tab(s)"
+        return None
+
+    async def end_goal(self, browser):
+        """Called after every goal: free caches and recycle the context if due"""
+        self.goals_since_recycle += 1
+        # Also covers the VRAM soft limit: emptying the cache is all we can do
+        self.free_memory()
+        if self._over("vram", soft=True):
+            print("⚠️ VRAM still above soft limit after freeing the cache")
+
+        if self._pages_over(browser):
+            await browser.close_extra_pages()
+
+        due = self.recycle_every and self.goals_since_recycle >= self.recycle_every
+        if due or self.recycle_pending or self._over("browser", soft=True):
+            await self._recycle(browser)
+
+        self.print_metrics(browser)
+
+    async def _recycle(self, browser):
+        started = time.monotonic()
+        try:
+            await browser.recycle_context()
+            self.recycle_count += 1
+        except Exception as e:
+            print(f"⚠️ Browser context recycle failed: {e}")
+        self.goals_since_recycle = 0
+        self.recycle_pending = False
+        self.free_memory()
+        print(f"♻️ Resources reclaimed in {time.monotonic() - started:.1f}s")
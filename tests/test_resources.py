@@ -0,0 +1,266 @@
+import asyncio
+
+import pytest
+
+from src import resources
+from src.resources import ResourceManager, _env_int, _env_mb
+
+ENV_VARS = [
+    "OCULAR_BROWSER_SOFT_MB", "OCULAR_BROWSER_HARD_MB",
+    "OCULAR_VRAM_SOFT_MB", "OCULAR_VRAM_HARD_MB",
+    "OCULAR_MAX_PAGES", "OCULAR_RECYCLE_EVERY", "OCULAR_LIMIT_COOLDOWN",
+]
+
+
+class StubBrowser:
+    def __init__(self, pages=1, fail=False):
+        self.pages = pages
+        self.fail = fail
+        self.recycles = 0
+        self.extra_closes = 0
+
+    def page_count(self):
+        return self.pages
+
+    async def recycle_context(self):
+        if self.fail:
+            raise RuntimeError("boom")
+        self.recycles += 1
+
+    async def close_extra_pages(self):
+        self.extra_closes += 1
+        closed = self.pages - 1
+        self.pages = 1
+        return closed
+
+
+@pytest.fixture
+def usage(monkeypatch):
+    """Fake memory readings: set usage['browser'] / usage['vram'] in MB"""
+    values = {"browser": None, "vram": None}
+    monkeypatch.setattr(resources, "get_browser_rss_mb", lambda: values["browser"])
+    monkeypatch.setattr(resources, "get_vram_mb", lambda: (values["vram"], values["vram"]))
+    return values
+
+
+@pytest.fixture
+def manager(monkeypatch, usage):
+    for name in ENV_VARS:
+        monkeypatch.delenv(name, raising=False)
+    manager = ResourceManager()
+    manager.frees = 0
+
+    def free_memory():
+        manager.frees += 1
+    manager.free_memory = free_memory
+    manager.print_metrics = lambda browser=None: None
+    return manager
+
+
+# --- Environment parsing ---
+
+def test_env_mb_default_when_unset(monkeypatch):
+    monkeypatch.delenv("OCULAR_TEST_MB", raising=False)
+    assert _env_mb("OCULAR_TEST_MB", 123) == 123
+
+
+def test_env_mb_parses_float_and_zero(monkeypatch):
+    monkeypatch.setenv("OCULAR_TEST_MB", "1.5")
+    assert _env_mb("OCULAR_TEST_MB", 123) == 1.5
+    monkeypatch.setenv("OCULAR_TEST_MB", "0")
+    assert _env_mb("OCULAR_TEST_MB", 123) == 0
+
+
+def test_env_invalid_falls_back_to_default(monkeypatch):
+    monkeypatch.setenv("OCULAR_TEST_MB", "lots")
+    assert _env_mb("OCULAR_TEST_MB", 123) == 123
+    assert _env_int("OCULAR_TEST_MB", 7) == 7
+
+
+def test_env_int_rejects_float(monkeypatch):
+    monkeypatch.setenv("OCULAR_TEST_N", "2.5")
+    assert _env_int("OCULAR_TEST_N", 7) == 7
+    monkeypatch.setenv("OCULAR_TEST_N", "3")
+    assert _env_int("OCULAR_TEST_N", 7) == 3
+
+
+def test_limits_read_from_env(monkeypatch):
+    monkeypatch.setenv("OCULAR_BROWSER_HARD_MB", "999")
+    monkeypatch.setenv("OCULAR_RECYCLE_EVERY", "0")
+    manager = ResourceManager()
+    assert manager.browser_hard_mb == 999
+    assert manager.recycle_every == 0
+
+
+# --- Limit checks ---
+
+def test_over_selects_soft_or_hard_limit(manager, usage):
+    manager.browser_soft_mb, manager.browser_hard_mb = 100, 200
+    usage["browser"] = 150
+    assert manager._over("browser", soft=True)
+    assert not manager._over("browser", soft=False)
+
+
+def test_over_uses_reserved_vram(manager, usage):
+    manager.vram_soft_mb, manager.vram_hard_mb = 100, 200
+    usage["vram"] = 250
+    assert manager._over("vram", soft=True)
+    assert manager._over("vram", soft=False)
+    assert not manager._over("browser", soft=True)
+
+
+def test_over_disabled_limit_or_unknown_value(manager, usage):
+    manager.browser_soft_mb = 0
+    usage["browser"] = 10 ** 6
+    assert not manager._over("browser", soft=True)
+
+    manager.browser_soft_mb = 100
+    usage["browser"] = None
+    assert not manager._over("browser", soft=True)
+
+
+# --- Between steps ---
+
+def test_check_step_does_nothing_under_limits(manager, usage):
+    browser = StubBrowser()
+    usage["browser"] = 10
+    asyncio.run(manager.check_step(browser))
+    assert browser.recycles == 0
+    assert browser.extra_closes == 0
+    assert manager.frees == 0
+
+
+def run_steps(manager, browser, steps):
+    """Run check_step repeatedly, returning which steps freed the CUDA cache"""
+    fired = []
+    for _ in range(steps):
+        before = manager.frees
+        asyncio.run(manager.check_step(browser))
+        fired.append(manager.frees > before)
+    return fired
+
+
+def test_hard_limit_cooldown_keeps_n_quiet_steps(manager, usage):
+    manager.vram_hard_mb = 100
+    manager.cooldown_steps = 2
+    usage["vram"] = 500
+
+    # Stays over the limit: each firing is followed by two quiet steps
+    fired = run_steps(manager, StubBrowser(), 7)
+    assert fired == [True, False, False, True, False, False, True]
+
+
+def test_hard_limit_cooldown_of_one_step(manager, usage):
+    manager.vram_hard_mb = 100
+    manager.cooldown_steps = 1
+    usage["vram"] = 500
+
+    fired = run_steps(manager, StubBrowser(), 5)
+    assert fired == [True, False, True, False, True]
+
+
+def test_hard_limit_without_cooldown_fires_every_step(manager, usage):
+    manager.vram_hard_mb = 100
+    manager.cooldown_steps = 0
+    usage["vram"] = 500
+
+    assert run_steps(manager, StubBrowser(), 3) == [True, True, True]
+
+
+def test_hard_vram_limit_only_frees_cache(manager, usage):
+    manager.vram_hard_mb = 100
+    usage["vram"] = 500
+    browser = StubBrowser()
+
+    asyncio.run(manager.check_step(browser))
+
+    assert manager.frees == 1
+    assert browser.recycles == 0
+    assert not manager.recycle_pending
+
+
+def test_hard_browser_limit_defers_recycle_to_end_of_goal(manager, usage):
+    manager.recycle_every = 0
+    manager.browser_hard_mb = 100
+    usage["browser"] = 500
+    browser = StubBrowser(pages=3)
+
+    note = asyncio.run(manager.check_step(browser))
+
+    # No reload mid-goal, only extra tabs are closed and reported
+    assert browser.recycles == 0
+    assert browser.extra_closes == 1
+    assert manager.recycle_pending
+    assert "closed 2" in note
+
+    usage["browser"] = 10
+    asyncio.run(manager.end_goal(browser))
+    assert browser.recycles == 1
+    assert not manager.recycle_pending
+
+
+def test_too_many_pages_closes_extra_pages(manager):
+    manager.max_pages = 3
+    browser = StubBrowser(pages=4)
+    note = asyncio.run(manager.check_step(browser))
+    assert browser.extra_closes == 1
+    assert browser.recycles == 0
+    assert note.startswith("SYSTEM:")
+
+
+def test_check_step_returns_no_note_when_nothing_closed(manager):
+    assert asyncio.run(manager.check_step(StubBrowser())) is None
+
+
+# --- After a goal ---
+
+def test_end_goal_recycles_every_n_goals(manager):
+    manager.recycle_every = 2
+    browser = StubBrowser()
+
+    asyncio.run(manager.end_goal(browser))
+    assert browser.recycles == 0
+    assert manager.goals_since_recycle == 1
+
+    asyncio.run(manager.end_goal(browser))
+    assert browser.recycles == 1
+    assert manager.goals_since_recycle == 0
+    assert manager.recycle_count == 1
+
+
+def test_end_goal_without_schedule_or_limits(manager):
+    manager.recycle_every = 0
+    browser = StubBrowser()
+    for _ in range(10):
+        asyncio.run(manager.end_goal(browser))
+    assert browser.recycles == 0
+    assert manager.frees == 10
+
+
+def test_end_goal_recycles_over_soft_browser_limit(manager, usage):
+    manager.recycle_every = 0
+    manager.browser_soft_mb = 100
+    usage["browser"] = 500
+    browser = StubBrowser()
+    asyncio.run(manager.end_goal(browser))
+    assert browser.recycles == 1
+
+
+def test_failed_recycle_is_not_counted(manager):
+    manager.recycle_every = 1
+    browser = StubBrowser(fail=True)
+    asyncio.run(manager.end_goal(browser))
+    assert manager.recycle_count == 0
+    assert manager.goals_since_recycle == 0
+
+
+def test_start_goal_resets_only_goal_lag_peak(manager):
+    manager.goal_max_lag_ms = manager.max_lag_ms = 250.0
+
+    # The peak survives end_goal, so 'stats' can still show it
+    asyncio.run(manager.end_goal(StubBrowser()))
+    assert manager.goal_max_lag_ms == 250.0
+
+    manager.start_goal()
+    assert manager.goal_max_lag_ms == 0.0
+    assert manager.max_lag_ms == 250.0